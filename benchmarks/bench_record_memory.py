@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Compares the memory used by a loaded places cache of plain dicts (the old format)
+# against the same cache stored as PlaceRecords.
+#
+#   ./benchmarks/bench_record_memory.py [-n 100000]
+
+import argparse
+import gc
+import os
+import pickle
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import place_record
+
+from place_record import FIELDS, PlaceRecord
+
+LOCALITIES = [f'{city}, OK {zip_code}, USA'
+              for city in ('Oklahoma City', 'Norman', 'Edmond', 'Moore', 'Yukon', 'Bethany', 'Midwest City')
+              for zip_code in range(73000, 73020)]
+OPEN_TIMES = ['7:00 AM', '10:00 AM', '11:00 AM', 'Open 24 hours']
+CLOSE_TIMES = ['2:00 PM', '9:00 PM', '10:00 PM', '11:00 PM']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+CHAINS = ['Taco Casa', 'Pho Lan', 'Cafe 7', 'Pub W', 'Eggroll King']
+
+
+def make_place(rng, i):
+    chain = rng.random() < 0.2
+    name = rng.choice(CHAINS) if chain else f'Restaurant {i}'
+    website = 'N/A'
+    if rng.random() < 0.6:
+        website = f'https://www.{name.lower().replace(" ", "")}.com/'
+    email = 'N/A'
+    if website != 'N/A' and rng.random() < 0.5:
+        email = f'info@{name.lower().replace(" ", "")}.com'
+    hours = 'N/A'
+    if rng.random() < 0.85:
+        open_time, close_time = rng.choice(OPEN_TIMES), rng.choice(CLOSE_TIMES)
+        hours = '; '.join(f'{day}: {open_time} – {close_time}' for day in DAYS)
+    return {
+        'name': name,
+        'address': f'{rng.randint(1, 20000)} {rng.choice("NSEW")} {rng.randint(1, 200)}th St, {rng.choice(LOCALITIES)}',
+        'phone': f'(405) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}',
+        'email': email,
+        'website': website,
+        'hours': hours,
+    }
+
+
+def measure_load(blob):
+    """Returns (bytes, cache) for unpickling a cache, the way load_cache does."""
+    gc.collect()
+    tracemalloc.start()
+    cache = pickle.loads(blob)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory benchmark for the places cache record format.')
+    parser.add_argument('--number', '-n', type=int, default=100_000, help='Number of records (default: 100000)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    dict_cache = {f'place_{i}': make_place(rng, i) for i in range(args.number)}
+    dict_blob = pickle.dumps(dict_cache)
+    record_blob = pickle.dumps({k: PlaceRecord.from_mapping(v) for k, v in dict_cache.items()})
+    del dict_cache
+    place_record._hours_pool.clear()  # so the shared strings are counted against the load
+
+    before, dicts = measure_load(dict_blob)
+    after, records = measure_load(record_blob)
+
+    # Sanity check: both formats hold exactly the same data
+    assert all(dict(records[k]) == dicts[k] for k in dicts)
+    assert all(list(records[k].keys()) == list(FIELDS) for k in records)
+
+    print(f'{args.number} records')
+    print(f'  dict records:  {before / 2**20:8.1f} MiB  ({before / args.number:6.0f} B/record)  pickle {len(dict_blob) / 2**20:6.1f} MiB')
+    print(f'  PlaceRecord:   {after / 2**20:8.1f} MiB  ({after / args.number:6.0f} B/record)  pickle {len(record_blob) / 2**20:6.1f} MiB')
+    print(f'  saved:         {(before - after) / 2**20:8.1f} MiB  ({100 * (before - after) / before:.0f}%)')
+
+
+if __name__ == '__main__':
+    main()
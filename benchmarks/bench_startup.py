@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# Measures how long the entry points take to import, using `python -X importtime`.
+# The "baseline" row imports find_businesses.py as it was at --base (checked out into a
+# temporary directory), which loaded every crawl and network dependency at module top.
+# The other rows are the current tree:
+#   --help             what `find_businesses.py --help` loads
+#   search path        plus requests, which every real run needs for geocoding and
+#                      searching, even when all place details are cached
+#   make_csv/cache_tool  the cache-only entry points
+#
+#   ./benchmarks/bench_startup.py [-r 5] [--base <commit>]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SCENARIOS = [
+    ('find_businesses.py --help',      'import find_businesses'),
+    ('find_businesses.py search path', 'import find_businesses, requests'),
+    ('make_csv.py',                    'import make_csv'),
+    ('cache_tool.py',                  'import cache_tool'),
+]
+
+
+def root_commit():
+    result = subprocess.run(['git', 'rev-list', '--max-parents=0', 'HEAD'],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return result.stdout.split()[-1]
+
+def checkout_file(commit, path, directory):
+    """Writes `path` as of `commit` into `directory`."""
+    result = subprocess.run(['git', 'show', f'{commit}:{path}'],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    with open(os.path.join(directory, os.path.basename(path)), 'w') as f:
+        f.write(result.stdout)
+
+
+def import_time_us(code, cwd):
+    """
+    Runs `code` under -X importtime and returns the microseconds spent importing
+    modules after interpreter startup (i.e. after 'site' has been imported).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=cwd, capture_output=True, text=True, check=True)
+    total = 0
+    after_site = False
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not after_site:
+            after_site = name.strip() == 'site'
+            continue
+        # Only top-level entries; nested imports are already in their parent's cumulative time
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup (import time) benchmark for the entry points.')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='Runs per scenario; the best is reported (default: 5)')
+    parser.add_argument('--base', type=str,
+                        help='Commit to take the baseline find_businesses.py from (default: the root commit)')
+    args = parser.parse_args()
+
+    def best_of(code, cwd):
+        return min(import_time_us(code, cwd) for _ in range(args.repeat))
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        base = args.base or root_commit()
+        checkout_file(base, 'find_businesses.py', base_dir)
+        baseline = best_of('import find_businesses', base_dir)
+    print(f'{"baseline find_businesses.py (" + base[:7] + ")":36} {baseline / 1000:8.1f} ms')
+
+    for label, code in SCENARIOS:
+        best = best_of(code, REPO_DIR)
+        saved = baseline - best
+        print(f'{label:36} {best / 1000:8.1f} ms  (saves {saved / 1000:6.1f} ms, {100 * saved / baseline:.0f}%)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+
+import argparse
+import bisect
+import csv
+import os
+import re
+import sys
+import time
+
+from place_record import FIELDS, NA
+from places_cache import DEFAULT_BUSINESS_TYPE, cache_file_for, gc_paused, load_cache, save_cache
+
+DAY_SECS = 24 * 60 * 60
+
+# Age buckets for the stats report: (label, upper bound in days)
+AGE_BUCKETS = [
+    ('< 1 day',    1),
+    ('< 1 week',   7),
+    ('< 1 month',  30),
+    ('< 3 months', 90),
+    ('< 1 year',   365),
+    ('older',      None),
+]
+
+WORD_REGEX = re.compile(r'[a-z0-9]+')
+
+
+def split_emails(email):
+    if not email or email == NA:
+        return []
+    return [e.strip().lower() for e in email.split(';') if e.strip()]
+
+# Much cheaper than urlparse(), which matters when indexing millions of websites
+HOST_REGEX = re.compile(r'^(?:[a-z][a-z0-9+.-]*:)?//(?:[^@/?#]*@)?(?:www\.)?([^/:?#]+)', re.IGNORECASE)
+
+def website_domain(website):
+    """Returns the host of a website URL without 'www.', e.g. 'example.com', or None."""
+    if not website or website == NA:
+        return None
+    match = HOST_REGEX.match(website if '//' in website else f'//{website}')
+    return match.group(1).lower() if match else None
+
+def parent_domains(domain):
+    """'shop.example.com' -> ['shop.example.com', 'example.com']"""
+    if domain.count('.') < 2:
+        return [domain]
+    labels = domain.split('.')
+    return ['.'.join(labels[i:]) for i in range(len(labels) - 1)] or [domain]
+
+
+def on_domain(host, domain):
+    return host == domain or host.endswith(f'.{domain}')
+
+# Predicates for a single filtered pass over the cache.  Each one does a cheap substring
+# test first and only parses names, websites and emails that could possibly match.
+def name_matcher(query):
+    words = set(WORD_REGEX.findall(query.lower()))
+    if not words:
+        return lambda place: False
+    # Every query word must appear somewhere in the name: one regex call rules out most places
+    prefilter = re.compile(''.join(f'(?=.*{re.escape(word)})' for word in words), re.IGNORECASE | re.DOTALL).match
+    def matches(place):
+        name = place.name
+        # 'N/A' is a placeholder, not a name made of the words 'n' and 'a'
+        return name != NA and prefilter(name) is not None and words <= set(WORD_REGEX.findall(name.lower()))
+    return matches
+
+def domain_matcher(query):
+    domain = website_domain(query)
+    def matches(place):
+        website, email = place.website, place.email
+        if domain in website.lower():
+            host = website_domain(website)
+            if host and on_domain(host, domain):
+                return True
+        if domain in email.lower():
+            return any(on_domain(e.rsplit('@', 1)[-1], domain) for e in split_emails(email))
+        return False
+    return matches if domain else (lambda place: False)
+
+def email_matcher(query):
+    email = query.strip().lower()
+    return lambda place: email in place.email.lower() and email in split_emails(place.email)
+
+MATCHERS = {'name': name_matcher, 'domain': domain_matcher, 'email': email_matcher}
+
+
+class CacheIndex:
+    """
+    In-memory indexes over a places cache, for answering many queries in one run.
+
+    Lookups by name word, website/email domain and email address are dictionary
+    lookups rather than scans.  Each index is built in a single pass the first time
+    it is needed, so a batch only pays for the kinds of lookup it uses.  Building an
+    index costs a few full scans, so a single query is answered by a scan instead.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self._by_word = None
+        self._by_domain = None
+        self._by_email = None
+
+    @property
+    def by_word(self):
+        if self._by_word is None:
+            index = self._by_word = {}
+            findall = WORD_REGEX.findall
+            with gc_paused():
+                for place_id, place in self.cache.items():
+                    if place.name != NA:
+                        for word in set(findall(place.name.lower())):
+                            index.setdefault(word, []).append(place_id)
+        return self._by_word
+
+    @property
+    def by_email(self):
+        if self._by_email is None:
+            index = self._by_email = {}
+            with gc_paused():
+                for place_id, place in self.cache.items():
+                    if place.email != NA:
+                        for email in split_emails(place.email):
+                            index.setdefault(email, []).append(place_id)
+        return self._by_email
+
+    @property
+    def by_domain(self):
+        # Each domain is indexed under its parents too, so 'example.com' finds 'shop.example.com'
+        if self._by_domain is None:
+            index = self._by_domain = {}
+            domain_cache = {}  # websites repeat across chain locations
+            with gc_paused():
+                for place_id, place in self.cache.items():
+                    website = place.website
+                    if website != NA:
+                        domains = domain_cache.get(website)
+                        if domains is None:
+                            domain = website_domain(website)
+                            domains = domain_cache[website] = parent_domains(domain) if domain else []
+                        for domain in domains:
+                            index.setdefault(domain, []).append(place_id)
+                    if place.email != NA:
+                        for email in split_emails(place.email):
+                            for domain in parent_domains(email.rsplit('@', 1)[-1]):
+                                index.setdefault(domain, []).append(place_id)
+        return self._by_domain
+
+    def find_name(self, query):
+        """Places whose name contains every word of the query."""
+        words = WORD_REGEX.findall(query.lower())
+        if not words:
+            return set()
+        matches = set(self.by_word.get(words[0], ()))
+        for word in words[1:]:
+            matches.intersection_update(self.by_word.get(word, ()))
+        return matches
+
+    def find_domain(self, domain):
+        """Places whose website or email is on the domain (or a subdomain of it)."""
+        return set(self.by_domain.get(website_domain(domain), ()))
+
+    def find_email(self, email):
+        return set(self.by_email.get(email.strip().lower(), ()))
+
+    def find(self, kind, query):
+        return {'name': self.find_name, 'domain': self.find_domain, 'email': self.find_email}[kind](query)
+
+
+class AgeHistogram:
+    """Counts timestamps into AGE_BUCKETS; None timestamps are counted as 'unknown'."""
+    def __init__(self, now):
+        # Bucket i holds timestamps newer than cutoffs[i] (cutoffs are in descending order)
+        self.cutoffs = [-(now - max_days * DAY_SECS) for _, max_days in AGE_BUCKETS[:-1]]
+        self.counts = [0] * len(AGE_BUCKETS)
+        self.unknown = 0
+
+    def add(self, ts):
+        if ts is None:
+            self.unknown += 1
+        else:
+            self.counts[bisect.bisect_right(self.cutoffs, -ts)] += 1
+
+    def items(self):
+        yield from zip((label for label, _ in AGE_BUCKETS), self.counts)
+        yield 'unknown', self.unknown
+
+def percent(part, whole):
+    return f'{100 * part / whole:.1f}%' if whole else 'n/a'
+
+
+def stats(args):
+    cache = load_cache(args.cache_file)
+    now = time.time()
+    total = len(cache)
+    with_website = with_email = with_phone = emails = 0
+    fetched = AgeHistogram(now)
+    seen = AgeHistogram(now)
+
+    # One pass over the cache for everything
+    for place in cache.values():
+        if place.website != NA:
+            with_website += 1
+        if place.phone != NA:
+            with_phone += 1
+        if place.email != NA:
+            with_email += 1
+            emails += place.email.count(';') + 1
+        fetched.add(place.fetched_at)
+        seen.add(place.last_seen)
+
+    print(f'Cache file:        {args.cache_file} ({os.path.getsize(args.cache_file) / 2**20:.1f} MiB)'
+          if os.path.exists(args.cache_file) else f'Cache file:        {args.cache_file} (missing)')
+    print(f'Places:            {total}')
+    print(f'With phone:        {with_phone} ({percent(with_phone, total)})')
+    print(f'With website:      {with_website} ({percent(with_website, total)})')
+    print(f'With email:        {with_email} ({percent(with_email, total)} of places, '
+          f'{percent(with_email, with_website)} of places with a website)')
+    print(f'Email addresses:   {emails}')
+
+    for title, histogram in (('Fetched', fetched), ('Last seen in a search', seen)):
+        print(f'\n{title}:')
+        for label, count in histogram.items():
+            print(f'  {label:12} {count:8} ({percent(count, total)})')
+
+
+def write_places(writer, cache, place_ids, prefix=()):
+    for place_id in sorted(place_ids, key=lambda place_id: cache[place_id].name):
+        place = cache[place_id]
+        writer.writerow(prefix + (place_id,) + tuple(place[field] for field in FIELDS))
+
+def find(args):
+    if args.batch:
+        return find_batch(args)
+    criteria = [(kind, query) for kind, query in
+                (('name', args.name), ('domain', args.domain), ('email', args.email)) if query]
+    if not criteria:
+        sys.exit('Error: give at least one of --name, --domain or --email, or --batch')
+
+    # One query: a single filtered pass is much cheaper than building indexes
+    cache = load_cache(args.cache_file)
+    matchers = [MATCHERS[kind](query) for kind, query in criteria]
+    matches = [place_id for place_id, place in cache.items() if all(match(place) for match in matchers)]
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(('place_id',) + FIELDS)
+    write_places(writer, cache, matches)
+    print(f'{len(matches)} matching places', file=sys.stderr)
+
+def find_batch(args):
+    """
+    Answers many queries read from stdin, one per line: 'name <words>', 'domain <domain>'
+    or 'email <address>'.  The indexes are built once and shared by every query.
+    """
+    cache = load_cache(args.cache_file)
+    index = CacheIndex(cache)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(('query', 'place_id') + FIELDS)
+    queries = 0
+    for line in sys.stdin:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        kind, _, query = line.partition(' ')
+        if kind not in MATCHERS or not query.strip():
+            sys.exit(f'Error: expected "name|domain|email <query>", got: {line}')
+        write_places(writer, cache, index.find(kind, query.strip()), prefix=(line,))
+        queries += 1
+    print(f'{queries} queries answered', file=sys.stderr)
+
+
+def is_empty(place):
+    return (place.name == NA and place.website == NA and place.phone == NA
+            and place.email == NA and place.address == NA and place.hours == NA)
+
+def vacuum(args):
+    """Drops unusable entries, normalizes emails and rewrites the cache compactly."""
+    cache = load_cache(args.cache_file)
+    size_before = os.path.getsize(args.cache_file) if os.path.exists(args.cache_file) else 0
+
+    compacted = {}
+    with gc_paused():
+        for place_id, place in cache.items():
+            if not isinstance(place_id, str) or not place_id or is_empty(place):
+                continue
+            if place.email != NA:
+                emails = list(dict.fromkeys(split_emails(place.email)))  # dedupe, keep order
+                place.email = ';'.join(emails) if emails else NA
+            place.compact()
+            compacted[place_id] = place
+    dropped = len(cache) - len(compacted)
+    cache = compacted
+
+    if args.dry_run:
+        print(f'Would drop {dropped} of {dropped + len(cache)} places')
+        return
+    save_cache(cache, args.cache_file)
+    size_after = os.path.getsize(args.cache_file)
+    print(f'Dropped {dropped} places, {len(cache)} left; '
+          f'{size_before / 2**20:.1f} MiB -> {size_after / 2**20:.1f} MiB')
+
+
+def pick_record(a, b):
+    """
+    Picks which of two records for the same place to keep when merging, filling in
+    anything it lacks from the other.  Returns (record, changed) where changed tells
+    whether the result differs from `a`.
+    """
+    # Prefer the record that found an email, then the more recently fetched one
+    a_key = (a.email != NA, a.fetched_at or 0)
+    b_key = (b.email != NA, b.fetched_at or 0)
+    keep, other = (a, b) if a_key >= b_key else (b, a)
+    changed = keep is not a
+    # Fill in anything the kept record is missing from the other one
+    for field in FIELDS:
+        if keep[field] == NA and other[field] != NA:
+            keep[field] = other[field]
+            changed = True
+    seen = [ts for ts in (a.last_seen, b.last_seen) if ts is not None]
+    last_seen = max(seen) if seen else None
+    if last_seen != a.last_seen:
+        changed = True
+    keep.last_seen = last_seen
+    return keep, changed
+
+def merge(args):
+    """Merges caches written by several workers into one."""
+    merged = load_cache(args.cache_file)
+    for source in args.sources:
+        if not os.path.exists(source):
+            sys.exit(f'Error: cache file not found: {source}')
+        added = updated = 0
+        for place_id, place in load_cache(source).items():
+            place.compact()  # share strings with the records already merged
+            current = merged.get(place_id)
+            if current is None:
+                merged[place_id] = place
+                added += 1
+            else:
+                kept, changed = pick_record(current, place)
+                merged[place_id] = kept
+                if changed:
+                    updated += 1
+        print(f'{source}: {added} new, {updated} updated')
+
+    if args.dry_run:
+        print(f'Would write {len(merged)} places to {args.cache_file}')
+        return
+    save_cache(merged, args.cache_file)
+    print(f'Wrote {len(merged)} places to {args.cache_file}')
+
+
+def prune(args):
+    """Removes places that no search has returned in the last --unseen-days days."""
+    cache = load_cache(args.cache_file)
+    cutoff = time.time() - args.unseen_days * DAY_SECS
+
+    stale = [place_id for place_id, place in cache.items()
+             if (place.last_seen is None and args.include_unknown)
+             or (place.last_seen is not None and place.last_seen < cutoff)]
+
+    if args.dry_run:
+        print(f'Would prune {len(stale)} of {len(cache)} places')
+        return
+    for place_id in stale:
+        del cache[place_id]
+    save_cache(cache, args.cache_file)
+    print(f'Pruned {len(stale)} places, {len(cache)} left')
+
+
+# Main function to handle arguments
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain the places cache.")
+    parser.add_argument('--business-type', '-t', type=str, default=DEFAULT_BUSINESS_TYPE,
+                        help=f'Type of business for the cache file (default: {DEFAULT_BUSINESS_TYPE})')
+    parser.add_argument('--cache-file', '-f', type=str,
+                        help='Cache file to use (default: places_cache.pkl.{business_type})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='Show counts, email hit-rate and age distribution').set_defaults(func=stats)
+
+    find_parser = subparsers.add_parser('find', help='Look up places by name, domain or email (CSV to stdout)')
+    find_parser.add_argument('--batch', action='store_true',
+                             help='Read many queries from stdin ("name|domain|email <query>" per line) and '
+                                  'answer them from indexes built once')
+    find_parser.add_argument('--name', '-n', type=str, help='Words that must all appear in the name')
+    find_parser.add_argument('--domain', '-d', type=str, help='Website or email domain, e.g. example.com')
+    find_parser.add_argument('--email', '-e', type=str, help='Exact email address')
+    find_parser.set_defaults(func=find)
+
+    vacuum_parser = subparsers.add_parser('vacuum', help='Drop empty entries, normalize emails and compact the file')
+    vacuum_parser.set_defaults(func=vacuum)
+
+    merge_parser = subparsers.add_parser('merge', help='Merge other cache files (e.g. from workers) into this one')
+    merge_parser.add_argument('sources', nargs='+', help='Cache files to merge in')
+    merge_parser.set_defaults(func=merge)
+
+    prune_parser = subparsers.add_parser('prune', help='Remove places no search has returned recently')
+    prune_parser.add_argument('--unseen-days', type=float, required=True,
+                              help='Remove places not returned by any search in this many days')
+    prune_parser.add_argument('--include-unknown', action='store_true',
+                              help='Also remove places cached before last-seen times were recorded')
+    prune_parser.set_defaults(func=prune)
+
+    for subparser in (vacuum_parser, merge_parser, prune_parser):
+        subparser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    args = parser.parse_args()
+    args.cache_file = args.cache_file or cache_file_for(args.business_type)
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+# Structured events and live progress.
+#
+# Code emits events (e.g. 'place.cached', 'page.processed') instead of printing.  The
+# caller only bumps a counter and, if the event passes the level/sampling filters, puts
+# it on a queue; a background thread does the slow part: writing JSONL to a file,
+# printing messages and redrawing the aggregated progress line (places/sec, pages/sec,
+# ETA).  So the hot loops never block on the terminal.
+
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+# Progress view: label -> the events that count towards it
+PROGRESS_COUNTERS = {
+    'places': ('place.cached', 'place.fetched', 'place.failed'),
+    'pages':  ('page.processed',),
+    'emails': ('emails.found',),
+}
+
+REFRESH_SECS          = 0.5   # How often a terminal progress line is redrawn
+NON_TTY_REFRESH_SECS  = 10.0  # ...and how often it is printed when not on a terminal
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f'{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+class EventBus:
+    """
+    Collects events, writes them to an optional JSONL file and shows live progress.
+
+    Parameters:
+        events_file (str): Path of a JSONL file to append events to, or None.
+        level (str): Minimum level of events written to the events file.
+        console_level (str): Minimum level of events printed to the console.
+        sample (dict): Event name -> fraction (0..1] of those events to keep.  Sampled-out
+            events are still counted in the progress view.
+        progress (bool): Show the live progress view.
+        stream: Where console output goes (default: stdout).
+    """
+    def __init__(self, events_file=None, level='info', console_level='info', sample=None,
+                 progress=True, stream=None):
+        self.level = LEVELS[level]
+        self.console_level = LEVELS[console_level]
+        self.min_level = min(self.level, self.console_level) if events_file else self.console_level
+        self.sample_every = {event: max(1, round(1 / rate)) for event, rate in (sample or {}).items()}
+        self.progress = progress
+        self.stream = stream or sys.stdout
+        self.counts = {}
+        self.totals = {}
+        self.started = time.monotonic()
+        self.counter_started = {}  # label -> (start time, count at start), see set_total()
+
+        self._file = open(events_file, 'a', encoding='utf-8') if events_file else None
+        self._tty = self.stream.isatty()
+        self._queue = queue.SimpleQueue()
+        self._progress_shown = False
+        self._thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+        self._thread.start()
+
+    def emit(self, event, message=None, level='info', **fields):
+        """
+        Records an event.  Cheap enough to call from hot loops.
+
+        Parameters:
+            event (str): Dotted event name, e.g. 'place.fetched'.
+            message (str): Human readable text for the console, optional.
+            level (str): One of LEVELS.
+            **fields: Extra JSON-serializable data for the event.
+        """
+        count = self.counts.get(event, 0) + 1
+        self.counts[event] = count
+
+        level_no = LEVELS[level]
+        if level_no < self.min_level:
+            return
+        every = self.sample_every.get(event)
+        if every and count % every:
+            return
+        self._queue.put((time.time(), level, level_no, event, message, fields))
+
+    def set_total(self, name, total):
+        """
+        Sets the expected total for a progress counter (e.g. 'places'), enabling an ETA.
+        The counter's rate and ETA are measured from this call on, so earlier phases
+        (geocoding, searching) don't skew them.
+        """
+        self.counter_started[name] = (time.monotonic(), self._count(name))
+        self.totals[name] = total
+
+    def _count(self, name):
+        return sum(self.counts.get(event, 0) for event in PROGRESS_COUNTERS[name])
+
+    def close(self):
+        """Flushes pending events, prints a final progress line and closes the events file."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    # Everything below runs on the background thread
+    def _run(self):
+        interval = REFRESH_SECS if self._tty else NON_TTY_REFRESH_SECS
+        next_refresh = self.started + interval
+        while True:
+            try:
+                item = self._queue.get(timeout=REFRESH_SECS)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._handle(*item)
+            # The counters are live but messages wait in the queue, so the progress line is
+            # drawn once the queue has caught up (or is a whole interval overdue); otherwise
+            # it would show counts ahead of the messages printed before it
+            now = time.monotonic()
+            if self.progress and now >= next_refresh and (self._queue.empty() or now >= next_refresh + interval):
+                self._draw_progress()
+                next_refresh = now + interval
+
+        if self.progress:
+            self._draw_progress(final=True)
+        if self._file:
+            self._file.flush()
+
+    def _handle(self, ts, level, level_no, event, message, fields):
+        if self._file and level_no >= self.level:
+            record = {'ts': ts, 'level': level, 'event': event}
+            if message is not None:
+                record['message'] = message
+            record.update(fields)
+            self._file.write(json.dumps(record, default=str) + '\n')
+        if level_no >= self.console_level:
+            if message is None:
+                message = ' '.join([event] + [f'{k}={v}' for k, v in fields.items()])
+            self._clear_progress()
+            prefix = '' if level_no < LEVELS['warning'] else f'{level.upper()}: '
+            self.stream.write(f'{prefix}{message}\n')
+            self.stream.flush()
+
+    def progress_line(self):
+        now = time.monotonic()
+        elapsed = max(now - self.started, 1e-6)
+        parts = []
+        eta = None
+        for name in PROGRESS_COUNTERS:
+            count = self._count(name)
+            total = self.totals.get(name)
+            if not count and not total:
+                continue
+            started, count_at_start = self.counter_started.get(name, (self.started, 0))
+            rate = (count - count_at_start) / max(now - started, 1e-6)
+            done = f'{count}/{total}' if total else f'{count}'
+            parts.append(f'{name} {done} ({rate:.1f}/s)')
+            if total and rate > 0:
+                eta = max(eta or 0, max(total - count, 0) / rate)
+        if eta is not None:
+            parts.append(f'ETA {format_duration(eta)}')
+        parts.append(f'elapsed {format_duration(elapsed)}')
+        return ' | '.join(parts)
+
+    def _clear_progress(self):
+        if self._tty and self._progress_shown:
+            self.stream.write('\r\033[K')
+            self._progress_shown = False
+
+    def _draw_progress(self, final=False):
+        line = self.progress_line()
+        if self._tty:
+            self.stream.write(f'\r\033[K{line}' + ('\n' if final else ''))
+            self._progress_shown = not final
+        else:
+            self.stream.write(f'{line}\n')
+        self.stream.flush()
+
+
+# The process-wide bus.  Until configure() is called, events are just printed.
+_bus = None
+
+def configure(**kwargs):
+    """Replaces the process-wide event bus; takes the same arguments as EventBus."""
+    global _bus
+    if _bus is not None:
+        _bus.close()
+    _bus = EventBus(**kwargs)
+    return _bus
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        _bus = EventBus(progress=False)
+    return _bus
+
+def emit(event, message=None, level='info', **fields):
+    get_bus().emit(event, message, level, **fields)
+
+def set_total(name, total):
+    get_bus().set_total(name, total)
+
+def close():
+    if _bus is not None:
+        _bus.close()
+
+atexit.register(close)
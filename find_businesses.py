@@ -1,21 +1,23 @@
 #!/usr/bin/env python3
 
-import requests
 import re
 import csv
 import argparse
-import time
 import os
-import pickle
-import asyncio
-import aiohttp
-import tldextract
 import posixpath
+import time
 
 from math import radians, cos, sin, sqrt, atan2, degrees
-from bs4 import BeautifulSoup
 from urllib.parse import urldefrag, urlparse, urlunparse, urljoin, unquote, quote
-from aiolimiter import AsyncLimiter
+import events
+
+from google_api import GoogleAPIError, QuotaExhaustedError, get_client
+from place_record import PlaceRecord
+from places_cache import DEFAULT_BUSINESS_TYPE, cache_file_for, load_cache, save_cache
+
+# NOTE: asyncio, aiohttp, bs4, tldextract and aiolimiter are imported where they are used, so
+# that --help and runs whose place details are all cached don't pay for loading them.
+# (requests is still loaded by every real run, for geocoding and searching.)
 
 DEBUG = False
 
@@ -23,8 +25,6 @@ DEFAULT_CENTER        = 'Oklahoma City, OK'
 DEFAULT_BEARING       = 180  # degrees  (North = 0, East = 90, South = 180, West = 270)
 DEFAULT_DISTANCE      = 2.5  # km
 DEFAULT_SEARCH_RADIUS = 5    # km
-DEFAULT_BUSINESS_TYPE = "restaurant"
-DEFAULT_CACHE_FILE = "places_cache.pkl"  # File to store cached place details
 
 SLEEP_TIME_SECS = 0.25
 EARTH_RADIUS_KM = 6371  # Approximate radius of Earth in kilometers
@@ -145,39 +145,32 @@ EXCLUDED_DOMAINS = {
 }
 
 
-# Rate limiter: 1 request per second (adjust as needed)
-rate_limiter = AsyncLimiter(max_rate=2, time_period=SLEEP_TIME_SECS)  # 1 request per 1 second
+# Rate limiter for the website crawler, created on first use
+_rate_limiter = None
 
-# Initialize or load cache
-def load_cache(cache_file):
-    if os.path.exists(cache_file):
-        with open(cache_file, 'rb') as f:
-            return pickle.load(f)
-    return {}
-
-def save_cache(cache, cache_file):
-    with open(cache_file, 'wb') as f:
-        print(f'** Persisting cache file: {cache_file}...', end='')
-        pickle.dump(cache, f)
-        print('Done!')
+def get_rate_limiter():
+    global _rate_limiter
+    if _rate_limiter is None:
+        from aiolimiter import AsyncLimiter
+        _rate_limiter = AsyncLimiter(max_rate=2, time_period=SLEEP_TIME_SECS)  # 2 requests per SLEEP_TIME_SECS
+    return _rate_limiter
 
 # Google Geocoding API to convert an address into lat/long
 def get_lat_lng(address, api_key):
     geocode_url = 'https://maps.googleapis.com/maps/api/geocode/json'
     params = {
-        'address': address,
-        'key': api_key
+        'address': address
     }
-    print(f"Geocoding address '{address}'...")
-    response = requests.get(geocode_url, params=params)
-    time.sleep(SLEEP_TIME_SECS)
-    data = response.json()
-    if 'error_message' in data:
-        print(f"Error in Geocoding API: {data['error_message']}")
+    events.emit('geocode.start', f"Geocoding address '{address}'...", address=address)
+    try:
+        data = get_client(api_key).get(geocode_url, params)
+    except GoogleAPIError as e:
+        events.emit('geocode.error', f"Error in Geocoding API: {e}", level='error', address=address, status=e.status)
         return None
     if data['results']:
         location = data['results'][0]['geometry']['location']
-        print(f"Geocoding successful! Location: {location['lat']}, {location['lng']}")
+        events.emit('geocode.done', f"Geocoding successful! Location: {location['lat']}, {location['lng']}",
+                    lat=location['lat'], lng=location['lng'])
         return location['lat'], location['lng']
     return None
 
@@ -197,7 +190,8 @@ def move_center(lat, lng, distance_km, bearing_angle):
                               cos(distance_km / EARTH_RADIUS_KM) - sin(lat_rad) * sin(new_lat))
     new_lng = degrees(new_lng)  # Convert back to degrees
 
-    print(f"Moving center to new lat/lng: {new_lat}, {new_lng} based on bearing {bearing_angle}° and distance {distance_km} km")
+    events.emit('search.move', f"Moving center to new lat/lng: {new_lat}, {new_lng} based on bearing {bearing_angle}° and distance {distance_km} km",
+                level='debug', lat=new_lat, lng=new_lng)
     return new_lat, new_lng
 
 # Function to get businesses from Google Places API, filtering fast food and shifting center as needed
@@ -208,36 +202,36 @@ def get_businesses(location, api_key, business_type, num_results, distance_km, b
     lat, lng = location
 
     while len(all_businesses) < num_results:
-        print(f"\n=== Searching at lat={lat}, lng={lng} ===")
-        
+        events.emit('search.start', f"=== Searching at lat={lat}, lng={lng} ===", lat=lat, lng=lng)
+
         # Fetch businesses for the current location
         businesses = fetch_businesses_in_radius((lat, lng), api_key, radius, business_type)
         if not businesses:
-            print(f"No more businesses found in radius: {radius} meters. Shifting center.")
-        
+            events.emit('search.empty', f"No more businesses found in radius: {radius} meters. Shifting center.", radius=radius)
+
         # Filter out fast-food chains by name
         filtered_businesses = [r for r in businesses if not any(chain.lower() in r['name'].lower() for chain in FAST_FOOD_CHAINS)]
 
         # Filter out duplicates by checking place_id
         new_businesses = [r for r in filtered_businesses if r['place_id'] not in visited_place_ids]
         if not new_businesses:
-            print(f"No more new businesses found in radius: {radius} meters. Shifting center.")
+            events.emit('search.exhausted', f"No more new businesses found in radius: {radius} meters. Shifting center.", radius=radius)
 
         # Track visited places to avoid duplicates
         visited_place_ids.update(r['place_id'] for r in new_businesses)
 
         # Add unique new businesses to the final list
         all_businesses.extend(new_businesses)
-        
-        print(f"Retrieved {len(new_businesses)} new businesses, total unique valid businesses: {len(all_businesses)}")
+
+        events.emit('search.results', f"Retrieved {len(new_businesses)} new businesses, total unique valid businesses: {len(all_businesses)}",
+                    new=len(new_businesses), total=len(all_businesses))
 
         # Stop if we have enough businesses
         if len(all_businesses) >= num_results:
-            print(f"Reached the target of {num_results} businesses.")
+            events.emit('search.done', f"Reached the target of {num_results} businesses.", target=num_results)
             break
 
         # Shift the center if needed
-        print(f"Moving center by {distance_km} km at a bearing of {bearing_angle}°")
         lat, lng = move_center(lat, lng, distance_km, bearing_angle)
 
     return all_businesses[:num_results]
@@ -249,17 +243,23 @@ def fetch_businesses_in_radius(location, api_key, radius, business_type):
     params = {
         'location': f"{location[0]},{location[1]}",  # Latitude, Longitude
         'radius': radius,  # Use radius instead of rankby=distance for finer control
-        'type': business_type,
-        'key': api_key
+        'type': business_type
     }
+    client = get_client(api_key)
 
     while True:
-        response = requests.get(url, params=params)
-        time.sleep(SLEEP_TIME_SECS)
-        data = response.json()
-
-        if 'error_message' in data:
-            print(f"Error in Nearby Search API response: {data['error_message']}")
+        try:
+            # A fresh next_page_token reports INVALID_REQUEST until Google has it ready, so
+            # page requests wait for it to activate and retry that status with backoff
+            data = client.get(url, params, retry_invalid_request='pagetoken' in params)
+        except QuotaExhaustedError:
+            raise
+        except GoogleAPIError as e:
+            # A failed first page is a failed search, not an empty one: moving the center
+            # and searching again would just fail the same way
+            if 'pagetoken' not in params:
+                raise
+            events.emit('search.error', f"Error in Nearby Search API response: {e}", level='error', status=e.status)
             break
 
         if 'results' in data:
@@ -268,8 +268,7 @@ def fetch_businesses_in_radius(location, api_key, radius, business_type):
         next_page_token = data.get('next_page_token')
 
         if next_page_token:
-            print("Waiting for next page token...")
-            time.sleep(2)  # Required delay before using the next_page_token
+            events.emit('search.page', "Fetching next page...", level='debug')
             params['pagetoken'] = next_page_token
         else:
             # No more pages available, exit loop
@@ -281,21 +280,28 @@ def fetch_businesses_in_radius(location, api_key, radius, business_type):
 def get_place_details(cache, cache_file, place_id, api_key, index, total):
     # Check if the place is already cached
     if place_id in cache:
-        print(f"[{index}/{total}] Using cached details for place_id: {place_id} ({cache[place_id]['name']})")
+        cache[place_id].last_seen = time.time()
+        events.emit('place.cached', f"[{index}/{total}] Using cached details for place_id: {place_id} ({cache[place_id]['name']})",
+                    level='debug', place_id=place_id)
         return cache[place_id]
 
     # If not cached, fetch from the API
-    print(f"[{index}/{total}] Fetching details from Google for place_id: {place_id}...")
+    events.emit('place.fetching', f"[{index}/{total}] Fetching details from Google for place_id: {place_id}...",
+                level='debug', place_id=place_id)
     details_url = 'https://maps.googleapis.com/maps/api/place/details/json'
     details_params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,website,opening_hours,vicinity,geometry',
-        'key': api_key
+        'fields': 'name,formatted_address,formatted_phone_number,website,opening_hours,vicinity,geometry'
     }
 
-    details_response = requests.get(details_url, params=details_params)
-    time.sleep(SLEEP_TIME_SECS)
-    details_data = details_response.json()
+    try:
+        details_data = get_client(api_key).get(details_url, details_params)
+    except QuotaExhaustedError:
+        raise
+    except GoogleAPIError as e:
+        events.emit('place.failed', f"Error in Place Details API for place_id: {place_id}: {e}",
+                    level='error', place_id=place_id, status=e.status)
+        return PlaceRecord()
 
     if 'result' in details_data:
         result = details_data['result']
@@ -310,7 +316,12 @@ def get_place_details(cache, cache_file, place_id, api_key, index, total):
             emails = normalize_emails(emails)    # This effectively removes duplicates
             emails = prioritize_emails(emails)
             email = ';'.join(emails) if (emails and len(emails) > 0) else 'N/A'
-            print(f'=> Found the following emails: \"{'; '.join(emails)}\"')
+            if emails:
+                events.emit('emails.found', f'[{index}/{total}] {name}: found the following emails: \"{'; '.join(emails)}\"',
+                            place_id=place_id, emails=emails)
+            else:
+                events.emit('emails.none', f'[{index}/{total}] {name}: no emails found on {website}',
+                            level='debug', place_id=place_id)
         else:
             email = 'N/A'
 
@@ -319,22 +330,27 @@ def get_place_details(cache, cache_file, place_id, api_key, index, total):
         hours = '; '.join(hours_list) if hours_list else 'N/A'
 
         # Cache the place details including email
-        cache[place_id] = {
-            'name': name,
-            'address': address,
-            'phone': phone,
-            'email': email,
-            'website': website,
-            'hours': hours
-        }
+        now = time.time()
+        cache[place_id] = PlaceRecord(
+            name=name,
+            address=address,
+            phone=phone,
+            email=email,
+            website=website,
+            hours=hours,
+            fetched_at=now,
+            last_seen=now
+        )
 
         # save our cache file
         save_cache(cache, cache_file)
+        events.emit('place.fetched', level='debug', place_id=place_id, name=name, email=email)
 
         return cache[place_id]
     else:
-        print(f"Error: No result found for place_id: {place_id}")
-        return {'name': 'N/A', 'address': 'N/A', 'phone': 'N/A', 'email': 'N/A', 'website': 'N/A', 'hours': 'N/A'}
+        events.emit('place.failed', f"Error: No result found for place_id: {place_id}",
+                    level='error', place_id=place_id, status=details_data.get('status'))
+        return PlaceRecord()
 
 def normalize_emails(email_list):
     """
@@ -458,6 +474,8 @@ def should_exclude_url(url):
     Returns:
         bool: True if the URL should be excluded, False otherwise.
     """
+    import tldextract
+
     try:
         ext = tldextract.extract(url)
         domain = f"{ext.domain}.{ext.suffix}".lower()
@@ -469,9 +487,14 @@ def should_exclude_url(url):
         return True  # Exclude URLs that cannot be parsed
 
 def find_emails(start_url, debug=False):
+    import asyncio
+
     return asyncio.run(find_emails_async(start_url, debug))
 
 async def find_emails_async(start_url, debug=False):
+    import asyncio
+    import aiohttp
+
     emails = set()
     visited = set()
     queue = asyncio.Queue()
@@ -511,21 +534,25 @@ async def worker(session, emails, visited, queue, debug):
             continue
         visited.add(url)
         if should_exclude_url(url):
-            print(f'- Skipping excluded page: {url}')
+            events.emit('page.skipped', f'- Skipping excluded page: {url}', level='debug', url=url)
         else:
-          print(f'- Processing page: {url}')
+          events.emit('page.processed', f'- Processing page: {url}', level='debug', url=url)
           await process_page(url, session, emails, visited, queue, debug)
         queue.task_done()
 
 def get_domain(url):
+    import tldextract
+
     ext = tldextract.extract(url)
     domain = f"{ext.domain}.{ext.suffix}"
     return domain.lower()
 
 async def process_page(url, session, emails, visited, queue, debug):
+    from bs4 import BeautifulSoup
+
     try:
         # Use the rate limiter
-        async with rate_limiter:
+        async with get_rate_limiter():
             if debug:
                 print(f'Sending GET request to {url}')
             async with session.get(url, timeout=10) as response:
@@ -681,38 +708,80 @@ Example usage:
                         help='Google API Key. If not provided, the environment variable GOOGLE_API_KEY will be used.')
     parser.add_argument('--business-type', '-t', type=str, default=DEFAULT_BUSINESS_TYPE,
                         help=f'The type of business to search for (default: {DEFAULT_BUSINESS_TYPE}')
+    parser.add_argument('--cache-file', '-f', type=str,
+                        help='Cache file to use, e.g. one per worker for cache_tool.py merge '
+                             '(default: places_cache.pkl.{business_type})')
+    parser.add_argument('--events-file', type=str,
+                        help='Append structured events (JSON lines) to this file')
+    parser.add_argument('--events-level', type=str, default='debug', choices=events.LEVELS,
+                        help='Minimum level of events written to --events-file (default: debug)')
+    parser.add_argument('--console-level', type=str, default='info', choices=events.LEVELS,
+                        help='Minimum level of events printed to the console (default: info)')
+    parser.add_argument('--sample', type=str, action='append', default=[], metavar='EVENT=RATE',
+                        help='Only record a fraction of an event, e.g. page.processed=0.1 (may be repeated)')
+    parser.add_argument('--no-progress', action='store_true',
+                        help='Disable the live progress view')
     args = parser.parse_args()
 
+    sample = {}
+    for spec in args.sample:
+        event, _, rate = spec.partition('=')
+        try:
+            sample[event] = float(rate)
+        except ValueError:
+            parser.error(f'--sample expects EVENT=RATE, got: {spec}')
+        if not 0 < sample[event] <= 1:
+            parser.error(f'--sample rate must be in (0, 1], got: {spec}')
+
     # Check if the API key is provided via the command line or environment variable
     api_key = args.api_key or os.getenv('GOOGLE_API_KEY')
     if not api_key:
         print("Error: Google API key not provided. Please set the environment variable GOOGLE_API_KEY or use the --api-key flag.")
         return
 
+    events.configure(events_file=args.events_file, level=args.events_level, console_level=args.console_level,
+                     sample=sample, progress=not args.no_progress)
+    try:
+        run(args, api_key)
+    finally:
+        events.close()
+
+# Search for businesses, then fetch (or reuse cached) details for each one
+def run(args, api_key):
     # Load the cache
-    cache_file = f'{DEFAULT_CACHE_FILE}.{args.business_type}'
+    cache_file = args.cache_file or cache_file_for(args.business_type)
     cache = load_cache(cache_file)
 
     # Geocode the search center to get latitude and longitude
     search_center = args.search_center
     location = get_lat_lng(search_center, api_key)
     if not location:
-        print(f"Error: Unable to geocode location: {search_center}")
+        events.emit('geocode.failed', f"Error: Unable to geocode location: {search_center}", level='error')
         return
 
     # Get the list of businesses (handling pagination)
-    businesses = get_businesses(location, api_key, args.business_type, args.number, args.distance, args.bearing, args.search_radius)
+    try:
+        businesses = get_businesses(location, api_key, args.business_type, args.number, args.distance, args.bearing, args.search_radius)
+    except GoogleAPIError as e:
+        events.emit('search.failed', f"Error: Nearby Search failed, stopping: {e}", level='error', status=e.status)
+        return
 
     # Calculate distance and get details for each business
     detailed_businesses = []
     total_businesses = len(businesses)
-    for index, place in enumerate(businesses, start=1):
-        place_id = place.get('place_id')
+    events.set_total('places', total_businesses)
+    try:
+        for index, place in enumerate(businesses, start=1):
+            place_id = place.get('place_id')
 
-        # Get the detailed info (with caching and response debugging)
-        details = get_place_details(cache, cache_file, place_id, api_key, index, total_businesses)
+            # Get the detailed info (with caching and response debugging)
+            details = get_place_details(cache, cache_file, place_id, api_key, index, total_businesses)
 
-        detailed_businesses.append(details)
+            detailed_businesses.append(details)
+    except QuotaExhaustedError as e:
+        # Every remaining place would fail the same way; keep what was fetched so far
+        events.emit('details.failed', f"Error: Google API quota exhausted, stopping after {len(detailed_businesses)} of {total_businesses} places: {e}",
+                    level='error', status=e.status, done=len(detailed_businesses), total=total_businesses)
 
     # Save the updated cache
     save_cache(cache, cache_file)
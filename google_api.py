@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import random
+import threading
+import time
+
+import events
+
+DEFAULT_TIMEOUT_SECS = 10
+DEFAULT_MAX_RETRIES  = 6
+BACKOFF_BASE_SECS    = 0.5   # First retry waits up to this long...
+BACKOFF_CAP_SECS     = 32.0  # ...and no retry ever waits longer than this
+PAGE_TOKEN_DELAY_SECS = 2.0  # A fresh next_page_token takes about this long to become valid
+CIRCUIT_OPEN_SECS    = 60.0  # After quota pushback outlasts every retry, fail fast this long
+
+# Google reports these in the 'status' field of an otherwise successful HTTP response
+SUCCESS_STATUSES   = {'OK', 'ZERO_RESULTS'}
+THROTTLE_STATUSES  = {'OVER_QUERY_LIMIT'}
+TRANSIENT_STATUSES = {'UNKNOWN_ERROR'}
+
+# HTTP status codes that are worth retrying (429 also means "slow down")
+RETRYABLE_HTTP_CODES = {429, 500, 502, 503, 504}
+
+# OVER_QUERY_LIMIT messages that no amount of waiting will fix (daily quota, billing)
+PERMANENT_QUOTA_MARKERS = ('daily', 'billing')
+
+
+class GoogleAPIError(Exception):
+    """
+    Raised when a Google API call fails permanently, or keeps failing after all retries.
+
+    Attributes:
+        status (str): The Google status (e.g. 'REQUEST_DENIED') or 'HTTP <code>'.
+        message (str): The error message reported by Google, if any.
+    """
+    def __init__(self, status, message=''):
+        self.status = status
+        self.message = message
+        super().__init__(f'{status}: {message}' if message else status)
+
+
+class QuotaExhaustedError(GoogleAPIError):
+    """
+    Raised when the API quota is exhausted (a daily-quota or billing error, or throttling
+    that outlasted every retry) and by every call while the circuit breaker is open.
+    Other calls would fail the same way, so callers should stop rather than carry on.
+    """
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECS, cap=BACKOFF_CAP_SECS):
+    """
+    Computes a "full jitter" exponential backoff delay.
+
+    Parameters:
+        attempt (int): Zero-based retry attempt number.
+        base (float): Delay ceiling for the first attempt, in seconds.
+        cap (float): Maximum delay ceiling, in seconds.
+
+    Returns:
+        float: A random delay between 0 and min(cap, base * 2**attempt).
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AIMDRateController:
+    """
+    Paces requests using additive-increase / multiplicative-decrease.
+
+    Every successful call nudges the request rate up a little; every bit of quota
+    pushback (OVER_QUERY_LIMIT or HTTP 429) cuts it down sharply.  The rate settles
+    just under whatever the API is actually willing to serve.
+    """
+    def __init__(self, initial_rate=4.0, min_rate=0.5, max_rate=50.0, increase=1.0, decrease=0.5):
+        self.rate = initial_rate        # requests per second
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase        # requests/sec added per "window" of successes
+        self.decrease = decrease        # multiplier applied on pushback
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Blocks until the next request slot at the current rate."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        # Spread the additive increase across one window (~rate requests), like TCP
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Don't let requests that were already scheduled at the old rate go out
+            self._next_slot = max(self._next_slot, time.monotonic() + 1.0 / self.rate)
+
+
+class GoogleAPIClient:
+    """
+    A small client for the Google Maps web services (Geocoding, Places, ...).
+
+    One keep-alive requests.Session is shared by every call, requests are paced by an
+    AIMD rate controller, and transient failures are retried with jittered exponential
+    backoff.  Permanent failures raise GoogleAPIError.
+
+    Quota exhaustion trips a circuit breaker and raises QuotaExhaustedError: a daily-quota
+    or billing error fails every later call immediately, and throttling that outlasts all
+    retries fails calls immediately for CIRCUIT_OPEN_SECS.
+    """
+    def __init__(self, api_key, session=None, rate_controller=None,
+                 max_retries=DEFAULT_MAX_RETRIES, timeout=DEFAULT_TIMEOUT_SECS):
+        if session is None:
+            import requests  # Imported on first use, so importing this module stays cheap
+            session = requests.Session()
+        self.api_key = api_key
+        self.session = session
+        self.rate_controller = rate_controller or AIMDRateController()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._circuit_error = None     # Raised by every call while the circuit is open...
+        self._circuit_until = 0.0      # ...until this time.monotonic() value
+
+    def get(self, url, params, retry_invalid_request=False):
+        """
+        Calls a Google API endpoint and returns the decoded JSON response.
+
+        Parameters:
+            url (str): The endpoint URL.
+            params (dict): Query parameters; the API key is added automatically.
+            retry_invalid_request (bool): Treat INVALID_REQUEST as transient.  This is
+                what Google returns when a next_page_token is used before it is ready.
+
+        Returns:
+            dict: The JSON response, whose status is OK or ZERO_RESULTS.
+
+        Raises:
+            GoogleAPIError: On a permanent error, or when retries are exhausted.
+            QuotaExhaustedError: When the quota is exhausted or the circuit is open.
+        """
+        import requests
+
+        if self._circuit_error and time.monotonic() < self._circuit_until:
+            # Still paced, so a caller that keeps trying can't spin on the open circuit
+            self.rate_controller.wait()
+            raise QuotaExhaustedError(self._circuit_error.status, self._circuit_error.message)
+
+        params = dict(params, key=self.api_key)
+        last_error = None
+        # Don't send a page token before Google has had time to activate it
+        min_delay = PAGE_TOKEN_DELAY_SECS if retry_invalid_request else 0.0
+        delay = min_delay
+
+        for attempt in range(self.max_retries + 1):
+            if delay > 0:
+                time.sleep(delay)
+            self.rate_controller.wait()
+            # Unless the server tells us how long to wait, the next retry backs off
+            delay = max(min_delay, backoff_delay(attempt))
+
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                last_error = GoogleAPIError('NETWORK_ERROR', str(e))
+                self._retrying(url, attempt, last_error, delay)
+                continue
+
+            if response.status_code in RETRYABLE_HTTP_CODES:
+                last_error = GoogleAPIError(f'HTTP {response.status_code}', response.reason)
+                if response.status_code == 429:
+                    self._throttled(url, last_error)
+                    retry_after = response.headers.get('Retry-After', '')
+                    if retry_after.isdigit():
+                        delay = min(int(retry_after), BACKOFF_CAP_SECS)
+                self._retrying(url, attempt, last_error, delay)
+                continue
+            if response.status_code != 200:
+                raise GoogleAPIError(f'HTTP {response.status_code}', response.reason)
+
+            try:
+                data = response.json()
+            except ValueError:
+                # e.g. an HTML page from a proxy or captive portal
+                last_error = GoogleAPIError('BAD_RESPONSE', f'non-JSON response from {url}')
+                self._retrying(url, attempt, last_error, delay)
+                continue
+            status = data.get('status', 'OK')
+            if status in SUCCESS_STATUSES:
+                self.rate_controller.on_success()
+                return data
+
+            last_error = GoogleAPIError(status, data.get('error_message', ''))
+            if status in THROTTLE_STATUSES:
+                if any(marker in last_error.message.lower() for marker in PERMANENT_QUOTA_MARKERS):
+                    raise self._open_circuit(last_error, forever=True)
+                self._throttled(url, last_error)
+                self._retrying(url, attempt, last_error, delay)
+                continue
+            if status in TRANSIENT_STATUSES or (status == 'INVALID_REQUEST' and retry_invalid_request):
+                self._retrying(url, attempt, last_error, delay)
+                continue
+            raise last_error
+
+        if last_error.status in THROTTLE_STATUSES or last_error.status == 'HTTP 429':
+            raise self._open_circuit(last_error)
+        raise last_error
+
+    def _retrying(self, url, attempt, error, delay):
+        if attempt < self.max_retries:
+            events.emit('api.retry', f'Retrying {url} in {delay:.1f}s after {error}', level='debug',
+                        url=url, attempt=attempt + 1, status=error.status, delay=delay)
+
+    def _throttled(self, url, error):
+        self.rate_controller.on_throttle()
+        events.emit('api.throttle', f'Quota pushback ({error.status}), slowing to {self.rate_controller.rate:.2f} req/s',
+                    level='debug', url=url, status=error.status, rate=self.rate_controller.rate)
+
+    def _open_circuit(self, error, forever=False):
+        # Returns the QuotaExhaustedError to raise
+        error = self._circuit_error = QuotaExhaustedError(error.status, error.message)
+        self._circuit_until = float('inf') if forever else time.monotonic() + CIRCUIT_OPEN_SECS
+        events.emit('api.circuit_open', f'Google API quota exhausted, failing calls fast: {error}', level='warning',
+                    status=error.status, error_message=error.message, forever=forever)
+        return error
+
+
+# One client per API key, so every call in the process shares a session and a rate
+_clients = {}
+
+def get_client(api_key):
+    """Returns the shared GoogleAPIClient for the given API key, creating it on first use."""
+    client = _clients.get(api_key)
+    if client is None:
+        client = _clients[api_key] = GoogleAPIClient(api_key)
+    return client
@@ -1,15 +1,9 @@
 #!/usr/bin/env python3
 
 import csv
-import pickle
-import os
 
-# Load cache from the specified cache file
-def load_cache(cache_file):
-    if os.path.exists(cache_file):
-        with open(cache_file, 'rb') as f:
-            return pickle.load(f)
-    return {}
+from place_record import FIELDS
+from places_cache import DEFAULT_BUSINESS_TYPE, cache_file_for, load_cache
 
 # Write cache to CSV
 def cache_to_csv(output_file, cache_file):
@@ -20,13 +14,10 @@ def cache_to_csv(output_file, cache_file):
 
     # Write the sorted businesses to a CSV file
     print(f"Writing data to CSV file: {output_file}")
-    businesses = []
-    for k in cache.keys():
-        businesses.append(cache[k])
     with open(output_file, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=['name', 'address', 'phone', 'email', 'website', 'hours'])
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
         writer.writeheader()
-        writer.writerows(businesses)
+        writer.writerows(cache.values())
 
     print(f"Cache data written to {output_file} successfully!")
 
@@ -36,13 +27,13 @@ def main():
 
     parser = argparse.ArgumentParser(description="Export cached business data to a CSV file.")
     parser.add_argument('--output', '-o', type=str, help='Output CSV file (default: {business_type}_list.csv)')
-    parser.add_argument('--business-type', '-t', type=str, default='restaurant', 
-                        help='Type of business for the cache file (default: restaurant)')
+    parser.add_argument('--business-type', '-t', type=str, default=DEFAULT_BUSINESS_TYPE,
+                        help=f'Type of business for the cache file (default: {DEFAULT_BUSINESS_TYPE})')
 
     args = parser.parse_args()
 
     # Generate the cache file name and output CSV file name based on the business type
-    cache_file = f"places_cache.pkl.{args.business_type}"
+    cache_file = cache_file_for(args.business_type)
     output_file = args.output if args.output else f"{args.business_type}_list.csv"
 
     cache_to_csv(output_file, cache_file)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import sys
+
+from collections.abc import Mapping
+
+# The fields stored for each place, in CSV column order
+FIELDS = ('name', 'address', 'phone', 'email', 'website', 'hours')
+
+NA = sys.intern('N/A')
+
+# Identical opening-hours schedules (chains, common "Monday: 11:00 AM – 10:00 PM" weeks)
+# share a single tuple of interned day strings
+_hours_pool = {}
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _split_address(address):
+    """
+    Splits "123 Main St, Oklahoma City, OK 73102, USA" into the street part and the
+    interned locality part, which is shared by every place in the same city/zip.
+    """
+    if not isinstance(address, str) or ', ' not in address:
+        return _intern(address), None
+    street, locality = address.split(', ', 1)
+    return street, sys.intern(locality)
+
+def _split_hours(hours):
+    if not isinstance(hours, str) or '; ' not in hours:
+        return _intern(hours)
+    days = tuple(sys.intern(day) for day in hours.split('; '))
+    return _hours_pool.setdefault(days, days)
+
+
+class PlaceRecord(Mapping):
+    """
+    A compact, read-mostly record for one cached place.
+
+    Behaves like the dict it replaces ({'name': ..., 'address': ..., 'hours': ...}) so
+    existing code such as record['name'] and csv.DictWriter keeps working, but uses
+    __slots__ instead of a per-record dict and interns the values that repeat across
+    places: 'N/A', websites, the city/state/zip tail of addresses and opening hours.
+
+    Two timestamps (seconds since the epoch, None for places cached before they were
+    tracked) are kept outside the mapping view: fetched_at, when the details came from
+    Google, and last_seen, when a search last returned the place.
+    """
+    __slots__ = ('name', '_street', '_locality', 'phone', 'email', 'website', '_hours',
+                 'fetched_at', 'last_seen')
+
+    def __init__(self, name=NA, address=NA, phone=NA, email=NA, website=NA, hours=NA,
+                 fetched_at=None, last_seen=None):
+        self.name = NA if name == NA else name
+        self.address = address
+        self.phone = NA if phone == NA else phone
+        self.email = _intern(email)
+        self.website = _intern(website)
+        self.hours = hours
+        self.fetched_at = fetched_at
+        self.last_seen = last_seen
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """Builds a record from a dict (or any mapping) with the cache's field names."""
+        if isinstance(mapping, cls):
+            return mapping
+        return cls(*(mapping.get(field, NA) for field in FIELDS))
+
+    @property
+    def address(self):
+        if self._locality is None:
+            return self._street
+        return f'{self._street}, {self._locality}'
+
+    @address.setter
+    def address(self, value):
+        self._street, self._locality = _split_address(value)
+
+    @property
+    def hours(self):
+        if isinstance(self._hours, tuple):
+            return '; '.join(self._hours)
+        return self._hours
+
+    @hours.setter
+    def hours(self, value):
+        self._hours = _split_hours(value)
+
+    # Mapping interface, so a record can stand in for the old per-place dict
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __contains__(self, key):
+        return key in FIELDS
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __reduce__(self):
+        # Pickle the internal slots as-is: the shared locality strings and hours tuples are
+        # then written once per file (pickle memoizes them), and loading skips __init__
+        return (_restore, (self.name, self._street, self._locality, self.phone, self.email,
+                           self.website, self._hours, self.fetched_at, self.last_seen))
+
+    def compact(self):
+        """
+        Re-interns the shared values in place.  Records unpickled from different cache
+        files (e.g. merged from several workers) otherwise keep separate copies.
+        """
+        self.email = _intern(self.email)
+        self.website = _intern(self.website)
+        self._locality = _intern(self._locality)
+        if isinstance(self._hours, tuple):
+            self._hours = _hours_pool.setdefault(self._hours, self._hours)
+        else:
+            self._hours = _intern(self._hours)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+def _restore(name, street, locality, phone, email, website, hours, fetched_at, last_seen):
+    # Unpickling hook; assigns the slots directly, which is several times faster than __init__
+    record = PlaceRecord.__new__(PlaceRecord)
+    record.name = name
+    record._street = street
+    record._locality = locality
+    record.phone = phone
+    record.email = email
+    record.website = website
+    record._hours = hours
+    record.fetched_at = fetched_at
+    record.last_seen = last_seen
+    return record
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+# The places cache shared by find_businesses.py and make_csv.py.  This module (and
+# everything it imports) is deliberately light, so cache-only runs start quickly.
+
+import gc
+import os
+import pickle
+
+from contextlib import contextmanager
+
+import events
+
+from place_record import PlaceRecord
+
+DEFAULT_CACHE_FILE    = "places_cache.pkl"  # File to store cached place details
+DEFAULT_BUSINESS_TYPE = "restaurant"
+
+def cache_file_for(business_type):
+    """Returns the cache file name used for a business type, e.g. 'places_cache.pkl.restaurant'."""
+    return f'{DEFAULT_CACHE_FILE}.{business_type}'
+
+@contextmanager
+def gc_paused():
+    """
+    Pauses the cyclic garbage collector.  Loading, saving or indexing a big cache
+    creates millions of objects, none of which are garbage, and the collector would
+    otherwise rescan the whole growing heap over and over.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+# Initialize or load cache
+def load_cache(cache_file):
+    if os.path.exists(cache_file):
+        with gc_paused(), open(cache_file, 'rb') as f:
+            cache = pickle.load(f)
+        # Older cache files hold a plain dict per place; convert them to compact records
+        # in place, so each dict can be freed as soon as it has been replaced
+        for place_id, place in cache.items():
+            if type(place) is not PlaceRecord:
+                cache[place_id] = PlaceRecord.from_mapping(place)
+        return cache
+    return {}
+
+def save_cache(cache, cache_file):
+    # Write to a temporary file first, so an interrupted save never corrupts the cache
+    tmp_file = f'{cache_file}.tmp'
+    with gc_paused(), open(tmp_file, 'wb') as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    events.emit('cache.saved', f'** Persisted cache file: {cache_file}', level='debug', file=cache_file, places=len(cache))